@@ -1,11 +1,17 @@
-from sympy import S, Symbol
-from sympy.solvers.solveset import linsolve
+import ast
+from functools import lru_cache
+
+import numpy as np
 
 
 class OverconstrainedError(Exception):
     pass
 
 
+class UnderconstrainedError(Exception):
+    pass
+
+
 layout = [
     {
         "type": "Rect",
@@ -51,47 +57,202 @@ layout = [
 ]
 
 
-def _build_eqn(element, key):
-    if key not in element:
+def _constant(term):
+    coefficients, constant = term
+    if coefficients:
+        raise ValueError("Layout expressions must be linear.")
+    return constant
+
+
+def _combine(left, right, sign):
+    coefficients = dict(left[0])
+    for name, value in right[0].items():
+        coefficients[name] = coefficients.get(name, 0) + sign * value
+    # Terms that cancel out (like `a.x - a.x`) aren't references at all
+    coefficients = {k: v for k, v in coefficients.items() if v}
+    return coefficients, left[1] + sign * right[1]
+
+
+def _multiply(left, right):
+    if left[0]:
+        left, right = right, left
+    factor = _constant(left)
+    coefficients = {k: v * factor for k, v in right[0].items() if factor}
+    return coefficients, right[1] * factor
+
+
+_BINARY_OPS = {
+    ast.Add: lambda l, r: _combine(l, r, 1),
+    ast.Sub: lambda l, r: _combine(l, r, -1),
+    ast.Mult: _multiply,
+    ast.Div: lambda l, r: _multiply(l, ({}, 1 / _constant(r))),
+}
+
+
+def _linear_term(node):
+    """Reduce an expression node to a ({symbol: coefficient}, constant) pair.
+    """
+    if isinstance(node, ast.Expression):
+        return _linear_term(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return {}, float(node.value)
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return {"{}__{}".format(node.value.id, node.attr): 1.0}, 0.0
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return _multiply(({}, -1.0), _linear_term(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        return _BINARY_OPS[type(node.op)](
+            _linear_term(node.left), _linear_term(node.right))
+    raise ValueError("Unsupported layout expression: {}".format(ast.dump(node)))
+
+
+@lru_cache(maxsize=1024)
+def _parse_expression(expr):
+    """Parse an expression once; the result is shared, so keep it immutable."""
+    try:
+        coefficients, constant = _linear_term(ast.parse(expr, mode="eval"))
+    except (SyntaxError, ZeroDivisionError):
+        raise ValueError("Unsupported layout expression: {}".format(expr))
+    return tuple(coefficients.items()), constant
+
+
+def _build_eqn(symbol, expr):
+    """Express `symbol = expr` as a coefficient row and right hand side."""
+    if expr is None:
         return None
-    expr = element[key].replace('.', '__')
-    return S("-{}__{} + {}".format(element['id'], key, expr))
+    coefficients, constant = _parse_expression(expr)
+    row = {k: -v for k, v in coefficients}
+    row[symbol] = row.get(symbol, 0) + 1.0
+    if not row[symbol]:
+        # A self reference like `a.x = a.x` cancels out
+        del row[symbol]
+        if not row and not constant:
+            return None
+    return row, constant
+
+
+def _build_identity(total, start, length):
+    """Express `total = start + length` as a coefficient row."""
+    return {total: 1.0, start: -1.0, length: -1.0}, 0.0
+
+
+CONSTRAINT_KEYS = ('x', 'y', 'w', 'h', 'right', 'bottom')
+
+
+@lru_cache(maxsize=1024)
+def _equations_for(id, exprs):
+    """Build (and remember) the rows for one element's constraint fields.
+
+    `exprs` lines up with CONSTRAINT_KEYS. The rows are shared between calls,
+    so each is kept as an immutable tuple of (symbol, coefficient) pairs.
+    """
+    x, y, w, h, right, bottom = names = [
+        "{}__{}".format(id, key) for key in CONSTRAINT_KEYS]
+    rows = [_build_eqn(name, expr) for name, expr in zip(names, exprs)]
+    rows += [
+        # TODO: Convenience anchors, such as right, left, top, bottom,
+        # horizontal_center, vertical_center
+        _build_identity(right, x, w),
+        _build_identity(bottom, y, h),
+    ]
+    rows = tuple((tuple(row.items()), constant)
+                 for row, constant in filter(None, rows))
+    return rows, frozenset(s for row, _ in rows for s, _ in row)
 
 
 def get_equations(elements):
     eqns = []
+    symbols = set()
 
     if not elements:
-        return eqns
+        return eqns, symbols
 
     for e in elements:
-        eqns += [
-            _build_eqn(e, 'x'),  # TODO: Relative to parent
-            _build_eqn(e, 'y'),  # TODO: Relative to parent
-            _build_eqn(e, 'w'),
-            _build_eqn(e, 'h'),
-            _build_eqn(e, 'right'),
-            _build_eqn(e, 'bottom'),
-            # TODO: Convenience anchors, such as right, left, top, bottom,
-            # horizontal_center, vertical_center
-            S("-{0}__right + {0}__x + {0}__w".format(e['id'])),
-            S("-{0}__bottom + {0}__y + {0}__h".format(e['id'])),
-        ]
-        eqns += get_equations(e.get('children'))
-    return [e for e in eqns if e]
+        # TODO: x and y relative to parent
+        rows, row_symbols = _equations_for(
+            e['id'], tuple(e.get(key) for key in CONSTRAINT_KEYS))
+        eqns += rows
+        symbols.update(row_symbols)
+        child_eqns, child_symbols = get_equations(e.get('children'))
+        eqns += child_eqns
+        symbols.update(child_symbols)
+    return eqns, symbols
 
 
-def main():
-    equations = get_equations(layout)
-    symbols = set()
-    for eqn in equations:
-        symbols = symbols.union(eqn.atoms(Symbol))
-    symbols = list(symbols)
-    solved_equations = linsolve(equations, *symbols)
-    if not solved_equations:
+def solve(equations, symbols):
+    """Solve the linear system numerically, one column per symbol."""
+    columns = {s: i for i, s in enumerate(symbols)}
+    a = np.zeros((len(equations), len(symbols)))
+    b = np.zeros(len(equations))
+    for i, (row, constant) in enumerate(equations):
+        for symbol, coefficient in row:
+            a[i, columns[symbol]] = coefficient
+        b[i] = constant
+
+    if a.shape[0] == a.shape[1]:
+        try:
+            return np.linalg.solve(a, b)
+        except np.linalg.LinAlgError:
+            pass  # Singular; work out why below
+
+    # Otherwise there's only a solution if the system is consistent, and it's
+    # only unique if every symbol is pinned down
+    solution, _, rank, _ = np.linalg.lstsq(a, b, rcond=None)
+    if not np.allclose(a @ solution, b):
         raise OverconstrainedError("A solution could not be found.")
-    solve = list(solved_equations)[0]
-    print(list(zip(symbols, solve)))
+    if rank < len(symbols):
+        raise UnderconstrainedError(
+            "Not enough constraints to solve for: {}".format(
+                ", ".join(sorted(symbols))))
+    return solution
+
+
+def resolve(equations, symbols):
+    """Solve the layout by substitution, falling back to `solve`.
+
+    A layout is mostly a DAG: each element only refers to fields that are
+    already known, so nearly every equation has a single unknown once its
+    references are substituted. Only coupled leftovers need a real solver.
+    """
+    unknowns = [dict(row) for row, _ in equations]
+    constants = [constant for _, constant in equations]
+    uses = {}
+    for i, row in enumerate(unknowns):
+        for symbol in row:
+            uses.setdefault(symbol, []).append(i)
+
+    resolved = {}
+    queue = [i for i, row in enumerate(unknowns) if len(row) == 1]
+    while queue:
+        i = queue.pop()
+        if len(unknowns[i]) != 1:
+            continue  # Already resolved through another equation
+        (symbol, coefficient), = unknowns[i].items()
+        value = constants[i] / coefficient
+        resolved[symbol] = value
+        for j in uses[symbol]:
+            coefficient = unknowns[j].pop(symbol)
+            constants[j] -= coefficient * value
+            if len(unknowns[j]) == 1:
+                queue.append(j)
+
+    # Fully substituted equations must agree with what we resolved
+    leftover = []
+    for row, constant in zip(unknowns, constants):
+        if row:
+            leftover.append((tuple(row.items()), constant))
+        elif not np.isclose(constant, 0):
+            raise OverconstrainedError("A solution could not be found.")
+
+    remaining = [s for s in symbols if s not in resolved]
+    if remaining:
+        resolved.update(zip(remaining, solve(leftover, remaining).tolist()))
+    return resolved
+
+
+def main():
+    equations, symbols = get_equations(layout)
+    print(list(resolve(equations, symbols).items()))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 """A squib-inspired python library that does card generation "the Python way"
 """
 import json
+import math
+import re
 import warnings
+from itertools import zip_longest
 
 from .parser import parse
 from .renderer import CairoRenderer, TextAlignment
@@ -9,15 +12,56 @@ from .util import Color, BLACK
 
 
 def _scale_column_widths(columns, total_width):
-    # Until we're small enough...
-    while sum(columns) > total_width:
-        # find the biggest column(s)
-        biggest = max(columns)
-        # and shave off a tiny piece of them
-        columns = [c - 1 if c >= biggest else c for c in columns]
+    if sum(columns) <= total_width:
+        return columns
+    # Cap the biggest column(s) at a common width, bringing in the next
+    # biggest column whenever the cap would drop below it
+    order = sorted(range(len(columns)), key=lambda i: columns[i], reverse=True)
+    remainder = sum(columns)
+    for count, i in enumerate(order, 1):
+        remainder -= columns[i]
+        if count == len(order) or \
+                (total_width - remainder) / count >= columns[order[count]]:
+            break
+
+    # Keep whole pixels, handing the leftover ones to the widest columns
+    cap, extra = divmod(math.floor(total_width - remainder), count)
+    columns = list(columns)
+    for rank, i in enumerate(order[:count]):
+        columns[i] = cap + 1 if rank < extra else cap
     return columns
 
 
+# Markup and multi-line text can't be judged by their length
+_UNMEASURABLE = re.compile(r'[<&\n]')
+
+
+def _column_width(texts, measure_width, is_measured):
+    """Find the width of the widest text, measuring as few as possible.
+
+    The summed widths of its glyphs bound how wide a plain text can be, so the
+    texts are measured from the biggest bound down until no remaining text
+    could beat the widest one found. That only pays off when there are more
+    texts than glyphs still to measure; otherwise (or when the texts can't be
+    bounded that way) every text is measured.
+    """
+    texts = set(texts)
+    if not all(t.isascii() and not _UNMEASURABLE.search(t) for t in texts):
+        return max(measure_width(t) for t in texts)
+    characters = set().union(*texts)
+    if len(texts) <= sum(1 for c in characters if not is_measured(c)):
+        return max(measure_width(t) for t in texts)
+    glyphs = {c: measure_width(c) for c in characters}
+    bounds = sorted(((sum(glyphs[c] for c in t), t) for t in texts),
+                    reverse=True)
+    widest = 0
+    for bound, text in bounds:
+        if bound <= widest:
+            break
+        widest = max(widest, measure_width(text))
+    return widest
+
+
 MAX_TABLE_LINES = 100  # Since we set ellipsize, we need a max number of lines
 
 
@@ -123,20 +167,30 @@ class RenderInstance:
         data = json.loads(data)
         # TODO: Assert the table data is rectangular
 
-        # Set the font
+        # Set the font and layout; only the cell size changes from here on
         self.renderer.set_font(font_name, font_size)
+        self.renderer.configure_text_layout(width=w, height=-MAX_TABLE_LINES)
 
-        # First pass to generate the column widths
-        widths = [0] * len(data[0])
-        for row in data:
-            for i, text in enumerate(row):
-                text = text.replace("\\n", "\n")
+        # Repeated cells at the same layout width are only measured once
+        size_cache = {}
+
+        def measure(text, width):
+            key = (text, width)
+            if key not in size_cache:
                 self.renderer.set_text(text)
-                self.renderer.configure_text_layout(
-                    width=w, height=-MAX_TABLE_LINES)
-                this_w, _ = self.renderer.get_text_size()
-                this_w += padding_x * 2
-                widths[i] = max(this_w, widths[i])
+                self.renderer.set_dimensions(width, -MAX_TABLE_LINES)
+                size_cache[key] = self.renderer.get_text_size()
+            return size_cache[key]
+
+        # First pass to generate the column widths
+        widths = []
+        for column in zip_longest(*data):
+            # Rows may be short a cell or two
+            column = [text.replace("\\n", "\n") for text in column
+                      if text is not None]
+            this_w = _column_width(column, lambda t: measure(t, w)[0],
+                                   lambda t: (t, w) in size_cache)
+            widths.append(this_w + padding_x * 2)
 
         # Make the widths smaller until it fits
         widths = _scale_column_widths(widths, w)
@@ -149,10 +203,7 @@ class RenderInstance:
             # calculate the height of this row
             height = 0
             for j, text in enumerate(row):
-                self.renderer.set_text(text)
-                self.renderer.configure_text_layout(
-                    width=widths[j], height=-MAX_TABLE_LINES)
-                _, h = self.renderer.get_text_size()
+                _, h = measure(text, widths[j])
                 height = max(height, h)
             height += padding_y * 2
 
@@ -180,14 +231,14 @@ def render_string(layout, w, h, filename):
 
     # Based on the template, run the operations specified
     blorp = RenderInstance(filename, w, h)
+    commands = {
+        "Image": blorp.draw_image,
+        "Rect": blorp.draw_rect,
+        "Text": blorp.draw_text,
+        "Table": blorp.draw_table,
+    }
     for cmd, attrs in instructions:
-        func = {
-            "Image": blorp.draw_image,
-            "Rect": blorp.draw_rect,
-            "Text": blorp.draw_text,
-            "Table": blorp.draw_table,
-        }[cmd]
-        func(**attrs)
+        commands[cmd](**attrs)
 
     # Save the card to file
     blorp.save()
@@ -1,32 +1,55 @@
-from pyparsing import Literal, Word, srange, Group, OneOrMore, Dict, \
-    nestedExpr, restOfLine, stringEnd, ParseException
+import re
+from functools import lru_cache
 
-# TODO: Inline Comments SkipTo and remove \n from whitespace?
+# TODO: Inline Comments
 # TODO: Syntax errors are just failing silently for some reason
 from .util import Color
 
 
-def _build():
-    """Encapsulate so the variables don't leak out."""
-    # Basic punctuation
-    colon = Literal(':').suppress()
-    hashmark = Literal('#').suppress()
-    comment = (hashmark + restOfLine).suppress()
+class ParseError(Exception):
+    pass
 
-    # Enforce Python-style naming conventions
-    command_name = Word(srange("[A-Z]"), srange("[a-zA-Z0-9]"))  # StudlyCaps
-    field_name = Word(srange("[a-z_]"), srange("[a-z0-9_]"))  # lower_underscore
 
-    # Put it all together
-    fields = Dict(OneOrMore(Group(field_name + colon + restOfLine)))
-    fields = nestedExpr(opener="{", closer="}", content=fields)
-    command = Group(command_name + fields)
+# Comments take up a whole line, or follow a brace. Anything else with a `#`
+# in it is a field value.
+COMMENT = re.compile(
+    r'^([ \t]*(?:(?:[A-Z][a-zA-Z0-9]*)?[ \t]*\{|\})?)[ \t]*#[^\n]*',
+    re.MULTILINE)
+# StudlyCaps command names; fields run to the end of the line, so the closing
+# brace has to start its own line
+COMMAND = re.compile(r'\s*([A-Z][a-zA-Z0-9]*)\s*\{(.*?)^[ \t]*\}',
+                     re.MULTILINE | re.DOTALL)
+# lower_underscore field names
+FIELD = re.compile(r'\s*([a-z_][a-z0-9_]*)\s*:([^\n]*)')
 
-    # Configure the parser
-    tml_parser = OneOrMore(command) + stringEnd
-    tml_parser.ignore(comment)
-    return tml_parser
-TML_PARSER = _build()
+
+def _match_all(pattern, string: str):
+    """Yield consecutive matches of `pattern` which must cover the string."""
+    position = 0
+    while True:
+        match = pattern.match(string, position)
+        if not match:
+            break
+        yield match
+        position = match.end()
+    if string[position:].strip():
+        raise ParseError("Unexpected input at position {}".format(position))
+
+
+@lru_cache(maxsize=256)
+def _parse_float(exp: str) -> float:
+    return float(exp)
+
+
+@lru_cache(maxsize=256)
+def _parse_color(exp: str) -> Color:
+    return Color(*tuple(float(e) for e in exp.split(',')))
+
+
+NUMERIC_KEYS = frozenset({"x", "y", "w", "h", "radius", "padding_x",
+                          "padding_y", "line_spacing"})
+CONVERTERS = dict.fromkeys(NUMERIC_KEYS, _parse_float)
+CONVERTERS["color"] = _parse_color
 
 
 def _parse_expression(key: str, exp: str):
@@ -36,24 +59,26 @@ def _parse_expression(key: str, exp: str):
     exp = exp.strip()
 
     # TODO: Use regex to validate first?
-    # TODO: Maybe PyParsing could validate it
     # TODO: Support expressions (with `id` references)
-    if key in ["x", "y", "w", "h", "radius", "padding_x", "padding_y",
-               "line_spacing"]:
-        return float(exp)
-    if key == "color":
-        return Color(*tuple(float(e) for e in exp.split(',')))
+    convert = CONVERTERS.get(key)
+    if convert:
+        return convert(exp)
     return exp
 
 
 def parse(string: str) -> list:
     try:
         commands = []
-        for c, attrs in TML_PARSER.parseString(string):
-            attrs = attrs.asDict()
-            attrs = {k: _parse_expression(k, v) for k, v in attrs.items()}
-            commands.append((c, attrs))
+        for command in _match_all(COMMAND, COMMENT.sub(r'\1', string)):
+            fields = list(_match_all(FIELD, command.group(2)))
+            if not fields:
+                raise ParseError("{} has no fields".format(command.group(1)))
+            attrs = {f.group(1): _parse_expression(f.group(1), f.group(2))
+                     for f in fields}
+            commands.append((command.group(1), attrs))
+        if not commands:
+            raise ParseError("No commands found")
         return commands
-    except ParseException:
+    except ParseError:
         print("Parse Error:\n\n", string)
         return []
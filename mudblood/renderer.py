@@ -4,7 +4,8 @@ and GDK_PixBuf.
 
 import contextlib
 import math
-from ctypes import cdll, c_char_p, c_double, c_int, pointer
+from ctypes import cdll, c_char_p, c_double, c_int, c_void_p, pointer, \
+    POINTER
 from enum import IntEnum
 from functools import lru_cache
 
@@ -15,10 +16,56 @@ GDK = cdll.LoadLibrary('libgdk-3.so.0')
 CAIRO_FORMAT_ARGB32 = 0
 PANGO_SCALE = 1024
 
+# (start, end) angles of the quarter arc for each rounded rectangle corner
+_ARC_ANGLES = [(i*math.pi/2, ((i + 1) % 4)*math.pi/2) for i in range(4)]
+
+
+def _declare(function, *argtypes, restype=None):
+    """Give ctypes the signature so calls can take plain Python numbers."""
+    function.argtypes = list(argtypes)
+    function.restype = restype
+
+
+# Declare the hot drawing functions up front
+_declare(PC.cairo_move_to, c_void_p, c_double, c_double)
+_declare(PC.cairo_arc, c_void_p, c_double, c_double, c_double, c_double,
+         c_double)
+_declare(PC.cairo_rectangle, c_void_p, c_double, c_double, c_double,
+         c_double)
+_declare(PC.cairo_translate, c_void_p, c_double, c_double)
+_declare(PC.cairo_scale, c_void_p, c_double, c_double)
+_declare(PC.cairo_set_source_rgba, c_void_p, c_double, c_double, c_double,
+         c_double)
+_declare(PC.pango_layout_set_width, c_void_p, c_int)
+_declare(PC.pango_layout_set_height, c_void_p, c_int)
+_declare(PC.pango_layout_set_spacing, c_void_p, c_int)
+_declare(PC.pango_layout_set_alignment, c_void_p, c_int)
+_declare(PC.pango_layout_set_wrap, c_void_p, c_int)
+_declare(PC.pango_layout_set_ellipsize, c_void_p, c_int)
+_declare(PC.pango_layout_set_justify, c_void_p, c_int)
+_declare(PC.pango_layout_set_markup, c_void_p, c_char_p, c_int)
+_declare(PC.pango_layout_get_pixel_size, c_void_p, POINTER(c_int),
+         POINTER(c_int))
+
+# Return pointers whole; the default c_int restype would truncate them
+_declare(PC.cairo_image_surface_create, c_int, c_int, c_int,
+         restype=c_void_p)
+_declare(PC.cairo_create, c_void_p, restype=c_void_p)
+_declare(PC.pango_cairo_create_layout, c_void_p, restype=c_void_p)
+_declare(PC.pango_font_description_from_string, c_char_p, restype=c_void_p)
+_declare(PB.gdk_pixbuf_new_from_file, c_char_p, c_void_p, restype=c_void_p)
+
+
+@lru_cache(maxsize=512)
+def _encode(text: str) -> bytes:
+    return text.encode()
+
 
 @lru_cache(maxsize=25)
-def _load_font(description: str):
-    return PC.pango_font_description_from_string(c_char_p(description.encode()))
+def _load_font(font_name: str, font_size: int):
+    description = "{} {}".format(font_name, font_size)
+    return c_void_p(PC.pango_font_description_from_string(
+        _encode(description)))
 
 
 @lru_cache(maxsize=100)
@@ -26,6 +73,7 @@ def _load_image(file: str=None) -> (object, int, int):
     buffer = PB.gdk_pixbuf_new_from_file(file.encode(), None)
     if not buffer:
         raise FileNotFoundError(file)
+    buffer = c_void_p(buffer)
     width = PB.gdk_pixbuf_get_width(buffer)
     height = PB.gdk_pixbuf_get_height(buffer)
     return buffer, width, height
@@ -53,25 +101,48 @@ class EllipsizeMode(IntEnum):
 class CairoRenderer:
     def __init__(self, width: int, height: int):
         """Initialize a text-enabled cairo surface we can draw on."""
-        self.surface = PC.cairo_image_surface_create(
-            CAIRO_FORMAT_ARGB32, int(width), int(height))
-        self.context = PC.cairo_create(self.surface)
-        self.layout = PC.pango_cairo_create_layout(self.context)
+        self.surface = c_void_p(PC.cairo_image_surface_create(
+            CAIRO_FORMAT_ARGB32, int(width), int(height)))
+        self.context = c_void_p(PC.cairo_create(self.surface))
+        self.layout = c_void_p(PC.pango_cairo_create_layout(self.context))
         self.buffer = None
 
+        # Bind the functions used in tight drawing loops
+        self._move_to = PC.cairo_move_to
+        self._arc = PC.cairo_arc
+        self._rectangle = PC.cairo_rectangle
+        self._close_path = PC.cairo_close_path
+        self._translate = PC.cairo_translate
+        self._scale = PC.cairo_scale
+        self._set_source_rgba = PC.cairo_set_source_rgba
+        self._stroke = PC.cairo_stroke
+        self._fill = PC.cairo_fill
+        self._set_markup = PC.pango_layout_set_markup
+        self._get_pixel_size = PC.pango_layout_get_pixel_size
+        self._set_width = PC.pango_layout_set_width
+        self._set_height = PC.pango_layout_set_height
+
     def set_font(self, font_name: str, font_size: int):
-        description = "{} {}".format(font_name, font_size)
-        font = _load_font(description)
+        font = _load_font(font_name, font_size)
         PC.pango_layout_set_font_description(self.layout, font)
 
     def set_text(self, text: str):
-        PC.pango_layout_set_markup(self.layout, c_char_p(text.encode()), -1)
+        self._set_markup(self.layout, _encode(text), -1)
 
     def get_text_size(self) -> (int, int):
         w = pointer(c_int(0))
         h = pointer(c_int(0))
-        PC.pango_layout_get_size(self.layout, w, h)
-        return w[0]/PANGO_SCALE, h[0]/PANGO_SCALE
+        self._get_pixel_size(self.layout, w, h)
+        return w[0], h[0]
+
+    def set_dimensions(self, width: float=-1.0, height: float=-1.0) -> None:
+        """Resize the text layout, leaving the rest of its settings alone."""
+        if width != -1:
+            width *= PANGO_SCALE
+        if height != -1:
+            height *= PANGO_SCALE
+        self._set_width(self.layout, int(width))
+        self._set_height(self.layout, int(height))
 
     def configure_text_layout(
             self,
@@ -83,17 +154,11 @@ class CairoRenderer:
             justify: bool=False) -> None:
 
         # Dimensions
-        if width != -1:
-            width *= PANGO_SCALE
-        if height != -1:
-            height *= PANGO_SCALE
-        PC.pango_layout_set_width(self.layout, c_int(int(width)))
-        PC.pango_layout_set_height(self.layout, c_int(int(height)))
+        self.set_dimensions(width, height)
 
         # Spacing
         line_spacing = int(line_spacing * PANGO_SCALE)
-        PC.pango_layout_set_spacing(
-            self.layout, c_int(line_spacing))
+        PC.pango_layout_set_spacing(self.layout, line_spacing)
 
         # Alignment
         PC.pango_layout_set_alignment(self.layout, alignment)
@@ -109,53 +174,54 @@ class CairoRenderer:
 
     @contextlib.contextmanager
     def translate(self, x: float, y: float):
-        PC.cairo_translate(self.context, c_double(x), c_double(y))
+        self._translate(self.context, x, y)
         try:
             yield
         finally:
-            PC.cairo_translate(self.context, c_double(-x), c_double(-y))
+            self._translate(self.context, -x, -y)
 
     @contextlib.contextmanager
     def scale(self, x: float, y: float):
-        PC.cairo_scale(self.context, c_double(x), c_double(y))
+        self._scale(self.context, x, y)
         try:
             yield
         finally:
-            PC.cairo_scale(self.context, c_double(1/x), c_double(1/y))
+            self._scale(self.context, 1/x, 1/y)
 
     # TODO: Parse several types of colors: 0-255, 0.0-1.0, #FFFFFF, 'black'
     # http://stackoverflow.com/questions/4296249/how-do-i-convert-a-hex-triplet-to-an-rgb-tuple-and-back
     def set_color(self, r: float, g: float, b: float, a: float):
-        PC.cairo_set_source_rgba(
-            self.context, c_double(r), c_double(g), c_double(b), c_double(a))
+        self._set_source_rgba(self.context, r, g, b, a)
 
     def plot_rectangle(self, x: float, y: float, width: float, height: float,
                        radius: float):
+        # Square corners don't need any arcs
+        if radius == 0:
+            self._rectangle(self.context, x, y, width, height)
+            return
+
         # Draw the geometry
         w = width
         h = height
         r = radius
-        PC.cairo_move_to(self.context, c_double(x), c_double(y + r))
+        self._move_to(self.context, x, y + r)
 
         def arc(a, b, c):
-            c1 = (c + 1) % 4
-            PC.cairo_arc(
-                self.context,
-                c_double(a), c_double(b), c_double(r),
-                c_double(c*math.pi/2), c_double(c1*math.pi/2))
+            start, end = _ARC_ANGLES[c]
+            self._arc(self.context, a, b, r, start, end)
 
         arc(x + r, y + r, 2)
         arc(x + w - r, y + r, 3)
         arc(x + w - r, y + h - r, 0)
         arc(x + r, y + h - r, 1)
 
-        PC.cairo_close_path(self.context)
+        self._close_path(self.context)
 
     def stroke(self):
-        PC.cairo_stroke(self.context)
+        self._stroke(self.context)
 
     def fill(self):
-        PC.cairo_fill(self.context)
+        self._fill(self.context)
 
     def set_image_buffer(self, filepath):
         """Load an image into the pixbuf."""
@@ -1,12 +1,12 @@
 """Some useful structs and other objects.
 """
+from typing import NamedTuple
 
 
 # TODO: Deprecate in favor of the renderer.py functionality
-class Color:
-    def __init__(self, r: float, g: float, b: float, a: float=1.0):
-        self._attrs = (r, g, b, a)
-
-    def __iter__(self):
-        return iter(self._attrs)
+class Color(NamedTuple):
+    r: float
+    g: float
+    b: float
+    a: float = 1.0
 BLACK = Color(0, 0, 0, 1)